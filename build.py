@@ -5,8 +5,10 @@ import os
 from datetime import datetime, timezone
 from pathlib import Path
 
-from generator import generate_site, generate_feed
+from generator import generate_feed, generate_service_worker, generate_site
 from scraper import fetch_posts
+from scraper.dedup import NearDuplicateIndex, collapse_duplicates
+from scraper.previews import PreviewCache, fetch_previews
 
 
 # Base URL for the live site. Override via environment variable for local testing
@@ -14,6 +16,16 @@ from scraper import fetch_posts
 # Example: SITE_URL="" python build.py  (for local file:// testing)
 SITE_URL = os.environ.get("SITE_URL", "https://krystofbe.github.io/fefe-interim")
 
+# MinHash signatures of previously seen posts. Kept outside output/ so it is not
+# deployed; CI restores it between runs with actions/cache.
+SIGNATURES_PATH = Path(".cache/signatures.json")
+
+# Fetch titles/descriptions of external links and show them as link previews.
+# Off by default: it is the only step that talks to sites other than Reddit.
+# Example: LINK_PREVIEWS=1 python build.py
+LINK_PREVIEWS = os.environ.get("LINK_PREVIEWS", "") not in ("", "0")
+PREVIEW_CACHE_PATH = Path(".cache/link_previews.json")
+
 
 def main() -> None:
     print("fefe-interim build started")
@@ -29,6 +41,25 @@ def main() -> None:
     if not posts:
         print("WARNING: No posts fetched — site will be empty")
 
+    # Step 1b: Collapse near-duplicate reposts (only new posts are hashed)
+    dedup_index = NearDuplicateIndex.load(SIGNATURES_PATH)
+    known = len(dedup_index.signatures)
+    unique_posts = collapse_duplicates(posts, dedup_index)
+    dedup_index.save(SIGNATURES_PATH)
+    print(
+        f"Collapsed {len(posts) - len(unique_posts)} near-duplicate posts "
+        f"({len(dedup_index.signatures) - known} newly hashed)"
+    )
+    posts = unique_posts
+
+    # Step 1c: Optional link previews (cached across builds)
+    previews = {}
+    if LINK_PREVIEWS:
+        preview_cache = PreviewCache(PREVIEW_CACHE_PATH)
+        previews = fetch_previews([url for p in posts for url in p.external_links], preview_cache)
+        preview_cache.save()
+        print(f"Resolved {sum(1 for p in previews.values() if p.title)} link previews")
+
     # Step 2: Persist as JSON
     posts_json = output_dir / "posts.json"
     posts_list = [
@@ -46,6 +77,11 @@ def main() -> None:
             "upvote_ratio": p.upvote_ratio,
             "author": p.author,
             "external_links": p.external_links,
+            "link_previews": [
+                {"url": url, "title": previews[url].title, "description": previews[url].description}
+                for url in p.external_links
+                if url in previews and previews[url].title
+            ],
         }
         for p in posts
     ]
@@ -67,6 +103,9 @@ def main() -> None:
     generate_feed(data, output_dir, site_url=SITE_URL)
     print(f"Wrote RSS feed to {output_dir / 'feed.xml'}")
 
+    # Step 5: Service worker — last, it hashes the files written above
+    generate_service_worker(output_dir)
+
     print("Build complete")
 
 
@@ -1,4 +1,11 @@
-from generator.site import generate_site
+from generator.site import generate_site, generate_site_streaming, iter_posts_jsonl
 from generator.feed import generate_feed
+from generator.offline import generate_service_worker
 
-__all__ = ["generate_site", "generate_feed"]
+__all__ = [
+    "generate_site",
+    "generate_site_streaming",
+    "iter_posts_jsonl",
+    "generate_feed",
+    "generate_service_worker",
+]
@@ -0,0 +1,181 @@
+"""Single-pass multi-key post index for fefe-interim.
+
+Buckets every post by month, year, flair and author in one traversal. Each
+bucket is a posting list kept sorted by created_utc descending (newest first),
+so pages can be rendered straight from it and new posts can be added without
+re-sorting or re-scanning the archive.
+"""
+
+import hashlib
+import re
+import unicodedata
+from bisect import insort
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Iterable
+
+# Characters allowed in URL path segments generated for tag and author pages
+_SLUG_RE = re.compile(r"[^a-z0-9_-]+")
+# German characters NFKD would reduce to their base letter
+_TRANSLITERATE = str.maketrans({"ä": "ae", "ö": "oe", "ü": "ue", "ß": "ss"})
+
+
+def _tag_class(flair: str | None) -> str:
+    """Convert flair string to CSS class name.
+
+    Examples:
+    - 'Security' -> 'tag-security'
+    - 'Politik' -> 'tag-politik'
+    - None -> ''
+    """
+    if not flair:
+        return ""
+    return f"tag-{flair.lower()}"
+
+
+def _newest_first(post: dict) -> float:
+    """Sort key placing posts with larger created_utc first."""
+    return -post["created_utc"]
+
+
+def _short_hash(value: str) -> str:
+    return hashlib.sha1(value.encode("utf-8")).hexdigest()[:8]
+
+
+def _slugify(value: str) -> str:
+    """Convert a flair or author name into a safe URL path segment.
+
+    Umlauts are transliterated and other accents dropped. Names without any
+    usable character fall back to a short hash, so the slug is never empty.
+
+    Examples:
+    - 'Security' -> 'security'
+    - 'Netz & Technik' -> 'netz-technik'
+    - 'Überwachung' -> 'ueberwachung'
+    """
+    text = unicodedata.normalize("NFKD", value.lower().translate(_TRANSLITERATE))
+    text = text.encode("ascii", "ignore").decode("ascii")
+    return _SLUG_RE.sub("-", text).strip("-") or _short_hash(value)
+
+
+def _unique_slugs(names: Iterable[str]) -> dict[str, str]:
+    """Map each name to a slug, disambiguating names whose slugs collide.
+
+    Colliding names all get a hash suffix, so a name's path does not depend on
+    which other names happen to exist or in which order they were seen.
+    """
+    by_slug: dict[str, list[str]] = {}
+    for name in names:
+        by_slug.setdefault(_slugify(name), []).append(name)
+
+    slugs: dict[str, str] = {}
+    for slug, group in by_slug.items():
+        for name in group:
+            slugs[name] = slug if len(group) == 1 else f"{slug}-{_short_hash(name)}"
+    return slugs
+
+
+def flair_pages(counts: dict[str, int], labels: dict[str, str]) -> list[dict]:
+    """Sidebar/page data for flairs, most-used first.
+
+    Args:
+        counts: CSS tag class -> number of posts
+        labels: CSS tag class -> flair text for display
+
+    Each entry: {"label": str, "tag_class": str, "count": int, "path": "tag/<slug>/index.html"}
+    """
+    slugs = _unique_slugs(tag.removeprefix("tag-") for tag in counts)
+    pages = [
+        {
+            "label": labels[tag],
+            "tag_class": tag,
+            "count": count,
+            "path": f"tag/{slugs[tag.removeprefix('tag-')]}/index.html",
+        }
+        for tag, count in counts.items()
+    ]
+    pages.sort(key=lambda p: (-p["count"], p["label"].lower()))
+    return pages
+
+
+def author_pages(counts: dict[str, int]) -> list[dict]:
+    """Page data for authors, most posts first.
+
+    Each entry: {"label": str, "count": int, "path": "author/<slug>/index.html"}
+    """
+    slugs = _unique_slugs(counts)
+    pages = [
+        {"label": author, "count": count, "path": f"author/{slugs[author]}/index.html"}
+        for author, count in counts.items()
+    ]
+    pages.sort(key=lambda p: (-p["count"], p["label"].lower()))
+    return pages
+
+
+def year_pages(counts: dict[int, int]) -> list[dict]:
+    """Page data for years, newest first.
+
+    Each entry: {"year": int, "label": "YYYY", "count": int, "path": "YYYY/index.html"}
+    """
+    return [
+        {"year": year, "label": str(year), "count": counts[year], "path": f"{year}/index.html"}
+        for year in sorted(counts, reverse=True)
+    ]
+
+
+@dataclass
+class PostIndex:
+    """Posting lists for every grouping the site renders pages for.
+
+    Attributes:
+        months: (year, month) -> posts
+        years: year -> posts
+        flairs: CSS tag class (see _tag_class) -> posts
+        authors: author name -> posts
+        flair_labels: CSS tag class -> flair text as first seen, for display
+    """
+
+    months: dict[tuple[int, int], list[dict]] = field(default_factory=dict)
+    years: dict[int, list[dict]] = field(default_factory=dict)
+    flairs: dict[str, list[dict]] = field(default_factory=dict)
+    authors: dict[str, list[dict]] = field(default_factory=dict)
+    flair_labels: dict[str, str] = field(default_factory=dict)
+
+    def add(self, post: dict) -> None:
+        """Insert a post into every bucket it belongs to, keeping lists sorted."""
+        dt = datetime.fromtimestamp(post["created_utc"], tz=timezone.utc)
+        insort(self.months.setdefault((dt.year, dt.month), []), post, key=_newest_first)
+        insort(self.years.setdefault(dt.year, []), post, key=_newest_first)
+
+        tag = _tag_class(post.get("flair"))
+        if tag:
+            insort(self.flairs.setdefault(tag, []), post, key=_newest_first)
+            self.flair_labels.setdefault(tag, post["flair"])
+
+        author = post.get("author", "")
+        if author:
+            insort(self.authors.setdefault(author, []), post, key=_newest_first)
+
+    def add_all(self, posts: Iterable[dict]) -> None:
+        """Insert every post from *posts*."""
+        for post in posts:
+            self.add(post)
+
+    def flair_pages(self) -> list[dict]:
+        """Page data for every flair in the index, see flair_pages()."""
+        return flair_pages({tag: len(p) for tag, p in self.flairs.items()}, self.flair_labels)
+
+    def author_pages(self) -> list[dict]:
+        """Page data for every author in the index, see author_pages()."""
+        return author_pages({author: len(p) for author, p in self.authors.items()})
+
+    def year_pages(self) -> list[dict]:
+        """Page data for every year in the index, see year_pages()."""
+        return year_pages({year: len(p) for year, p in self.years.items()})
+
+
+def build_index(posts: Iterable[dict]) -> PostIndex:
+    """Build a PostIndex from *posts* in a single pass."""
+    index = PostIndex()
+    index.add_all(posts)
+    return index
@@ -0,0 +1,61 @@
+"""Service worker and precache manifest generator for fefe-interim."""
+
+import hashlib
+import json
+import re
+from pathlib import Path
+
+from generator.site import _create_environment
+
+# Archive month directories: YYYY/MM/index.html
+_MONTH_PAGE_RE = re.compile(r"^\d{4}/\d{2}/index\.html$")
+
+
+def _revision(path: Path) -> str:
+    """Short content hash of a file, used as its precache revision."""
+    return hashlib.sha256(path.read_bytes()).hexdigest()[:16]
+
+
+def generate_service_worker(output_dir: Path, recent_months: int = 3) -> None:
+    """Write sw.js and precache-manifest.json for the built site in output_dir.
+
+    Must run after all other output has been written, since the manifest
+    holds content hashes of the files it lists: index.html, the
+    *recent_months* newest archive pages, static/style.css and feed.xml.
+
+    The service worker serves listed files from a versioned precache and
+    other HTML and Google Fonts stale-while-revalidate from stable caches.
+    Its source embeds the manifest, so any content change produces a new
+    sw.js and browsers install it on the next visit, downloading only the
+    files whose hash changed.
+
+    Args:
+        output_dir: Directory containing the generated site.
+        recent_months: Number of newest YYYY/MM archive pages to precache.
+    """
+    output_dir = Path(output_dir)
+
+    month_pages = sorted(
+        (
+            path.relative_to(output_dir).as_posix()
+            for path in output_dir.glob("*/*/index.html")
+            if _MONTH_PAGE_RE.match(path.relative_to(output_dir).as_posix())
+        ),
+        reverse=True,
+    )
+    candidates = ["index.html", *month_pages[:recent_months], "static/style.css", "feed.xml"]
+
+    manifest = [
+        {"url": url, "revision": _revision(output_dir / url)}
+        for url in candidates
+        if (output_dir / url).is_file()
+    ]
+    manifest_json = json.dumps(manifest, indent=2)
+    version = hashlib.sha256(manifest_json.encode("utf-8")).hexdigest()[:12]
+
+    (output_dir / "precache-manifest.json").write_text(manifest_json + "\n", encoding="utf-8")
+    template = _create_environment().get_template("sw.js")
+    (output_dir / "sw.js").write_text(
+        template.render(version=version, manifest=manifest) + "\n", encoding="utf-8"
+    )
+    print(f"Wrote sw.js and precache-manifest.json ({len(manifest)} precached files, version {version})")
@@ -1,13 +1,18 @@
 """Site generation module for fefe-interim."""
 
+import json
 import re
 import shutil
+from collections.abc import Callable, Iterable, Iterator
 from datetime import datetime, timezone
+from itertools import groupby
 from pathlib import Path
 
 from jinja2 import Environment, FileSystemLoader, select_autoescape
 from markupsafe import Markup
 
+from generator.index import _tag_class, build_index, flair_pages, year_pages
+
 
 GERMAN_MONTHS = {
     1: "Januar",
@@ -74,38 +79,10 @@ def _format_date(timestamp: float) -> str:
     return dt.strftime("%Y-%m-%d · %H:%M")
 
 
-def _tag_class(flair: str | None) -> str:
-    """Convert flair string to CSS class name.
-
-    Examples:
-    - 'Security' -> 'tag-security'
-    - 'Politik' -> 'tag-politik'
-    - None -> ''
-    """
-    if not flair:
-        return ""
-    return f"tag-{flair.lower()}"
-
-
-def _group_posts_by_month(posts: list[dict]) -> dict[tuple[int, int], list[dict]]:
-    """Group posts by (year, month) using created_utc timestamp.
-
-    Returns a dict mapping (year, month) tuples to lists of posts.
-    Posts within each month are sorted by created_utc descending (newest first).
-    """
-    grouped: dict[tuple[int, int], list[dict]] = {}
-    for post in posts:
-        dt = datetime.fromtimestamp(post["created_utc"], tz=timezone.utc)
-        key = (dt.year, dt.month)
-        if key not in grouped:
-            grouped[key] = []
-        grouped[key].append(post)
-
-    # Sort posts within each month newest first
-    for key in grouped:
-        grouped[key].sort(key=lambda p: p["created_utc"], reverse=True)
-
-    return grouped
+def _month_key(post: dict) -> tuple[int, int]:
+    """Return the (year, month) bucket of a post based on created_utc."""
+    dt = datetime.fromtimestamp(post["created_utc"], tz=timezone.utc)
+    return (dt.year, dt.month)
 
 
 def _build_archive_months(grouped: dict[tuple[int, int], list[dict]]) -> list[dict]:
@@ -114,8 +91,19 @@ def _build_archive_months(grouped: dict[tuple[int, int], list[dict]]) -> list[di
     Each entry: {"year": int, "month": int, "label": "Monat YYYY", "count": int, "path": "YYYY/MM/index.html"}
     Sorted by date descending (newest month first).
     """
+    return _build_archive_months_from_counts(
+        {key: len(posts) for key, posts in grouped.items()}
+    )
+
+
+def _build_archive_months_from_counts(counts: dict[tuple[int, int], int]) -> list[dict]:
+    """Build the archive_months sidebar list from per-month post counts.
+
+    Same output as _build_archive_months, but only needs the counts — used by
+    the streaming generator, which never holds a whole month map in memory.
+    """
     months = []
-    for (year, month), posts in grouped.items():
+    for (year, month), count in counts.items():
         label = f"{GERMAN_MONTHS[month]} {year}"
         path = f"{year}/{month:02d}/index.html"
         months.append(
@@ -123,7 +111,7 @@ def _build_archive_months(grouped: dict[tuple[int, int], list[dict]]) -> list[di
                 "year": year,
                 "month": month,
                 "label": label,
-                "count": len(posts),
+                "count": count,
                 "path": path,
             }
         )
@@ -146,26 +134,26 @@ def generate_site(posts_data: dict, output_dir: Path, base_url: str = "") -> Non
     output_dir = Path(output_dir)
     output_dir.mkdir(parents=True, exist_ok=True)
 
-    # Set up Jinja2 environment
-    env = Environment(
-        loader=FileSystemLoader("templates"),
-        autoescape=select_autoescape(["html"]),
-    )
-
-    # Register custom filters
-    env.filters["markdown_to_html"] = _markdown_to_html
-    env.filters["format_date"] = _format_date
-    env.filters["tag_class"] = _tag_class
+    env = _create_environment()
 
     posts = posts_data["posts"]
 
-    # Group posts by month and build archive sidebar data
-    grouped = _group_posts_by_month(posts)
-    archive_months = _build_archive_months(grouped)
+    # Bucket posts by month, year, flair and author in one pass
+    index = build_index(posts)
+    grouped = index.months
+    archive_tags = index.flair_pages()
+    author_listing = index.author_pages()
+    # Context shared by every page: sidebar links and per-post author links
+    sidebar = {
+        "archive_months": _build_archive_months(grouped),
+        "archive_years": index.year_pages(),
+        "archive_tags": archive_tags,
+        "author_paths": {page["label"]: page["path"] for page in author_listing},
+    }
 
     # Render index.html (at root, so base_url is empty — links are relative to root)
     template = env.get_template("index.html")
-    html = template.render(posts=posts, archive_months=archive_months, base_url=base_url)
+    html = template.render(posts=posts, base_url=base_url, **sidebar)
 
     index_path = output_dir / "index.html"
     index_path.write_text(html, encoding="utf-8")
@@ -185,8 +173,8 @@ def generate_site(posts_data: dict, output_dir: Path, base_url: str = "") -> Non
         archive_html = archive_template.render(
             posts=month_posts,
             month_label=label,
-            archive_months=archive_months,
             base_url=archive_base_url,
+            **sidebar,
         )
 
         archive_path = archive_dir / "index.html"
@@ -195,7 +183,192 @@ def generate_site(posts_data: dict, output_dir: Path, base_url: str = "") -> Non
 
     print(f"Generated {archive_count} archive pages")
 
-    # Copy static assets to output dir
+    # Render year, flair and author pages straight from the index posting lists
+    listings = (
+        [(page, index.years[page["year"]], page["label"]) for page in sidebar["archive_years"]]
+        + [(page, index.flairs[page["tag_class"]], f"Tag: {page['label']}") for page in archive_tags]
+        + [(page, index.authors[page["label"]], f"Autor: {page['label']}") for page in author_listing]
+    )
+    for page, page_posts, label in listings:
+        _render_listing(
+            archive_template,
+            output_dir / page["path"],
+            posts=page_posts,
+            month_label=label,
+            # One "../" per directory level between the page and the site root
+            base_url="../" * page["path"].count("/"),
+            **sidebar,
+        )
+
+    print(f"Generated {len(listings)} year, tag and author pages")
+
+    _copy_static(output_dir)
+
+
+def generate_site_streaming(
+    post_source: Callable[[], Iterable[dict]],
+    output_dir: Path,
+    base_url: str = "",
+) -> None:
+    """Generate the static site without holding the whole archive in memory.
+
+    Produces the same month, year and tag pages as generate_site, but posts
+    are pulled from *post_source* and rendered with Jinja's template
+    streaming directly to disk. Only the sidebar summary (post counts per
+    month, year and flair) stays resident; each page's posts are consumed
+    one at a time as it renders. Memory is bounded, but time is not:
+
+    - Tag pages take one filtered pass over the source per flair, so the
+      total work is O(flairs × posts). That suits a handful of flairs.
+    - Author pages and per-post author links are not generated. Authors are
+      unbounded, so they would need one pass per author or a resident
+      author index.
+
+    This is a library entry point for archives read from a post store such
+    as iter_posts_jsonl; build.py renders its single fetch with generate_site.
+
+    Args:
+        post_source: Zero-argument callable returning a fresh iterable of post
+                     dicts, ordered by created_utc descending (newest first).
+                     It is called once per pass: sidebar summary, index.html,
+                     month pages, year pages and once per flair.
+                     iter_posts_jsonl(path) wrapped in a lambda is the usual source.
+        output_dir: Directory to write output files to
+        base_url: Base URL prefix for internal links on index.html (see generate_site).
+
+    Raises:
+        ValueError: If post_source does not yield posts newest first.
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    env = _create_environment()
+
+    # Pass 1: sidebar summary — counters per month, year and flair, no posts retained
+    month_counts: dict[tuple[int, int], int] = {}
+    flair_counts: dict[str, int] = {}
+    flair_labels: dict[str, str] = {}
+    for post in _ordered(post_source()):
+        key = _month_key(post)
+        month_counts[key] = month_counts.get(key, 0) + 1
+        tag = _tag_class(post.get("flair"))
+        if tag:
+            flair_counts[tag] = flair_counts.get(tag, 0) + 1
+            flair_labels.setdefault(tag, post["flair"])
+    year_counts: dict[int, int] = {}
+    for (year, _), count in month_counts.items():
+        year_counts[year] = year_counts.get(year, 0) + count
+    sidebar = {
+        "archive_months": _build_archive_months_from_counts(month_counts),
+        "archive_years": year_pages(year_counts),
+        "archive_tags": flair_pages(flair_counts, flair_labels),
+    }
+
+    # Pass 2: index.html — the for loop in the template consumes the iterator lazily
+    index_path = output_dir / "index.html"
+    env.get_template("index.html").stream(
+        posts=_ordered(post_source()), base_url=base_url, **sidebar
+    ).dump(str(index_path), encoding="utf-8")
+    print(f"Wrote {index_path} ({index_path.stat().st_size} bytes)")
+
+    # Pass 3: archive pages — each month's posts are streamed from the source
+    archive_template = env.get_template("archive.html")
+    archive_count = 0
+    archive_base_url = "../../"
+    for (year, month), month_iter in groupby(_ordered(post_source()), key=_month_key):
+        label = f"{GERMAN_MONTHS[month]} {year}"
+        archive_dir = output_dir / str(year) / f"{month:02d}"
+        archive_dir.mkdir(parents=True, exist_ok=True)
+
+        archive_template.stream(
+            posts=month_iter,
+            month_label=label,
+            base_url=archive_base_url,
+            **sidebar,
+        ).dump(str(archive_dir / "index.html"), encoding="utf-8")
+        archive_count += 1
+
+    print(f"Generated {archive_count} archive pages")
+
+    # Pass 4: year pages, grouped the same way
+    for year, year_iter in groupby(_ordered(post_source()), key=lambda p: _month_key(p)[0]):
+        year_dir = output_dir / str(year)
+        year_dir.mkdir(parents=True, exist_ok=True)
+        archive_template.stream(
+            posts=year_iter, month_label=str(year), base_url="../", **sidebar
+        ).dump(str(year_dir / "index.html"), encoding="utf-8")
+
+    print(f"Generated {len(year_counts)} year pages")
+
+    # Pass 5+: one filtered pass per flair; flairs are few, posts are many
+    for page in sidebar["archive_tags"]:
+        tag_path = output_dir / page["path"]
+        tag_path.parent.mkdir(parents=True, exist_ok=True)
+        tag_posts = (
+            post for post in _ordered(post_source())
+            if _tag_class(post.get("flair")) == page["tag_class"]
+        )
+        archive_template.stream(
+            posts=tag_posts,
+            month_label=f"Tag: {page['label']}",
+            base_url="../" * page["path"].count("/"),
+            **sidebar,
+        ).dump(str(tag_path), encoding="utf-8")
+
+    print(f"Generated {len(sidebar['archive_tags'])} tag pages")
+
+    _copy_static(output_dir)
+
+
+def iter_posts_jsonl(path: Path) -> Iterator[dict]:
+    """Yield post dicts one at a time from a JSON Lines post store.
+
+    The store holds one post object (same fields as posts.json) per line,
+    newest first. Blank lines are skipped.
+    """
+    with Path(path).open(encoding="utf-8") as fh:
+        for line in fh:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _ordered(posts: Iterable[dict]) -> Iterator[dict]:
+    """Pass posts through, raising ValueError if created_utc ever increases.
+
+    Streaming generation groups consecutive posts by month, so an unordered
+    source would silently split a month across several renders.
+    """
+    previous = float("inf")
+    for post in posts:
+        if post["created_utc"] > previous:
+            raise ValueError(
+                f"Post {post.get('id', '?')} is out of order: post source must "
+                "yield posts sorted by created_utc descending"
+            )
+        previous = post["created_utc"]
+        yield post
+
+
+def _render_listing(template, path: Path, **context) -> None:
+    """Render *template* with *context* to *path*, creating parent directories."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(template.render(**context), encoding="utf-8")
+
+
+def _create_environment() -> Environment:
+    """Create the Jinja2 environment with the site's custom filters registered."""
+    env = Environment(
+        loader=FileSystemLoader("templates"),
+        autoescape=select_autoescape(["html"]),
+    )
+    env.filters["markdown_to_html"] = _markdown_to_html
+    env.filters["format_date"] = _format_date
+    env.filters["tag_class"] = _tag_class
+    return env
+
+
+def _copy_static(output_dir: Path) -> None:
+    """Copy static assets to output_dir/static, replacing any previous copy."""
     static_src = Path("static")
     static_dst = output_dir / "static"
     if static_src.exists():
@@ -0,0 +1,337 @@
+"""
+Near-duplicate and crosspost detection for Reddit posts.
+
+The same story often lands on r/fefe_blog_interim several times with slightly
+different titles or bodies. Each post is reduced to a set of shingles (word
+3-grams of title and body, plus its external links), summarised as a MinHash
+signature, and bucketed with LSH banding. A new post is only compared against
+posts sharing at least one band bucket, so lookups stay sub-linear instead of
+comparing every pair. Crossposts of a linked article are matched on the
+normalised link, but only when the repost adds next to no text of its own or
+cites exactly the same links with broadly similar wording, since many distinct
+posts cite the same source. Signatures and links are persisted so each build
+only hashes posts it has not seen before.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import random
+import re
+from pathlib import Path
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+from scraper.types import Post
+
+logger = logging.getLogger(__name__)
+
+# Mersenne prime 2^61 - 1: modulus for the universal hash permutations
+_PRIME = (1 << 61) - 1
+_WORD_RE = re.compile(r"\w+")
+# Markdown link syntax [text](url) — the URL is covered by external_links
+_MARKDOWN_LINK_RE = re.compile(r"\[([^\]]*)\]\([^)]*\)")
+_URL_RE = re.compile(r"https?://\S+")
+
+# A post with at most this many words of its own is a bare link share
+_BARE_LINK_MAX_WORDS = 8
+
+
+def _words(post: Post) -> list[str]:
+    """Lowercased words of title and body, with URLs removed but link text kept."""
+    text = _MARKDOWN_LINK_RE.sub(r"\1", f"{post.title}\n{post.body}")
+    text = _URL_RE.sub(" ", text)
+    return _WORD_RE.findall(text.lower())
+
+
+def _shingles(post: Post, size: int = 3) -> set[str]:
+    """Return the shingle set for a post.
+
+    Title and body are lowercased and tokenised into words; consecutive
+    *size*-word windows form the shingles. Each external link (scheme and
+    trailing slash dropped) is added as its own shingle. On its own that only
+    nudges the similarity; crossposts are handled in NearDuplicateIndex.add.
+    """
+    words = _words(post)
+
+    if len(words) < size:
+        shingles = set(words)
+    else:
+        shingles = {" ".join(words[i : i + size]) for i in range(len(words) - size + 1)}
+
+    for url in post.external_links:
+        shingles.add("url:" + url.split("://", 1)[-1].rstrip("/").lower())
+
+    return shingles
+
+
+def _normalize_link(url: str) -> str | None:
+    """Normalise an external link for exact crosspost matching.
+
+    Drops scheme, "www.", fragment, utm_* tracking parameters and trailing
+    slash. Returns None for links to a site's front page, which many
+    unrelated posts share.
+    """
+    try:
+        parts = urlsplit(url)
+        host = (parts.hostname or "").removeprefix("www.")
+    except ValueError:
+        return None
+    path = parts.path.rstrip("/")
+    if not host or not path:
+        return None
+    query = urlencode(
+        [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if not k.startswith("utm_")]
+    )
+    return f"{host}{path}" + (f"?{query}" if query else "")
+
+
+def _hash_shingle(shingle: str) -> int:
+    """Stable 64-bit hash of a shingle (Python's hash() is salted per process)."""
+    return int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class NearDuplicateIndex:
+    """MinHash signatures of seen posts, bucketed for LSH candidate lookup.
+
+    With num_perm=128 split into bands=16 of 8 rows, posts with a Jaccard
+    similarity of roughly 0.7 and above are likely to share a bucket; the
+    estimated similarity is then checked against *threshold*. Posts linking
+    the same article (see _normalize_link) are crossposts if the later one is
+    a bare link share, or if both cite the same set of links and reach the
+    lower *crosspost_threshold*.
+
+    Posts are ordered by (created_utc, id); a post's original always sorts
+    before it, so two posts can never be each other's original.
+    """
+
+    def __init__(
+        self,
+        num_perm: int = 128,
+        bands: int = 16,
+        threshold: float = 0.8,
+        seed: int = 1,
+        crosspost_threshold: float = 0.5,
+    ) -> None:
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be divisible by bands ({bands})")
+
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.crosspost_threshold = crosspost_threshold
+        self.seed = seed
+
+        rng = random.Random(seed)
+        self._perms = [
+            (rng.randrange(1, _PRIME), rng.randrange(0, _PRIME)) for _ in range(num_perm)
+        ]
+
+        self.signatures: dict[str, list[int]] = {}
+        self.created: dict[str, float] = {}
+        self.links: dict[str, list[str]] = {}
+        self.word_counts: dict[str, int] = {}
+        self._buckets: dict[tuple[int, tuple[int, ...]], list[str]] = {}
+        self._link_posts: dict[str, list[str]] = {}
+
+    def signature(self, post: Post) -> list[int] | None:
+        """Compute the MinHash signature of a post, or None if it has no content."""
+        hashes = [_hash_shingle(s) for s in _shingles(post)]
+        if not hashes:
+            return None
+        return [min((a * h + b) % _PRIME for h in hashes) for a, b in self._perms]
+
+    def _band_keys(self, signature: list[int]) -> list[tuple[int, tuple[int, ...]]]:
+        return [
+            (band, tuple(signature[band * self.rows : (band + 1) * self.rows]))
+            for band in range(self.bands)
+        ]
+
+    def _insert(
+        self,
+        post_id: str,
+        created_utc: float,
+        signature: list[int] | None,
+        links: list[str],
+        word_count: int,
+    ) -> None:
+        self.created[post_id] = created_utc
+        self.links[post_id] = links
+        self.word_counts[post_id] = word_count
+        for link in links:
+            self._link_posts.setdefault(link, []).append(post_id)
+        if signature is not None:
+            self.signatures[post_id] = signature
+            for key in self._band_keys(signature):
+                self._buckets.setdefault(key, []).append(post_id)
+
+    def similarity(self, sig_a: list[int], sig_b: list[int]) -> float:
+        """Estimated Jaccard similarity: fraction of matching MinHash slots."""
+        return sum(1 for a, b in zip(sig_a, sig_b) if a == b) / self.num_perm
+
+    def add(self, post: Post) -> str | None:
+        """Index a post and return the id of its original, if it has one.
+
+        The original is the most similar earlier post at or above *threshold*,
+        or failing that the earliest earlier crosspost: a post sharing one of
+        its links, where *post* is a bare link share (few words of its own) or
+        both cite the same link set at or above *crosspost_threshold*.
+        Posts already in the index (by id) are not rehashed; their stored
+        signature and links are reused.
+        """
+        known = post.id in self.created
+        if known:
+            signature = self.signatures.get(post.id)
+            links = self.links[post.id]
+            word_count = self.word_counts[post.id]
+        else:
+            signature = self.signature(post)
+            links = sorted({link for url in post.external_links if (link := _normalize_link(url))})
+            word_count = len(_words(post))
+
+        order = (post.created_utc, post.id)
+
+        def earlier(candidate: str) -> bool:
+            return (self.created[candidate], candidate) < order
+
+        best_id: str | None = None
+        if signature is not None:
+            best_sim = self.threshold
+            seen: set[str] = set()
+            for key in self._band_keys(signature):
+                for candidate in self._buckets.get(key, ()):
+                    if candidate in seen or not earlier(candidate):
+                        continue
+                    seen.add(candidate)
+                    sim = self.similarity(signature, self.signatures[candidate])
+                    if sim >= best_sim:
+                        best_id, best_sim = candidate, sim
+
+        if best_id is None and links:
+            bare_link = word_count <= _BARE_LINK_MAX_WORDS
+
+            def crosspost(candidate: str) -> bool:
+                if bare_link:
+                    return True
+                other = self.signatures.get(candidate)
+                return (
+                    self.links[candidate] == links
+                    and signature is not None
+                    and other is not None
+                    and self.similarity(signature, other) >= self.crosspost_threshold
+                )
+
+            crossposts = [
+                candidate
+                for link in links
+                for candidate in self._link_posts.get(link, ())
+                if earlier(candidate) and crosspost(candidate)
+            ]
+            if crossposts:
+                best_id = min(crossposts, key=lambda c: (self.created[c], c))
+
+        if not known and (signature is not None or links):
+            self._insert(post.id, post.created_utc, signature, links, word_count)
+        return best_id
+
+    def save(self, path: Path) -> None:
+        """Persist parameters and signatures as JSON."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = {
+            "num_perm": self.num_perm,
+            "bands": self.bands,
+            "seed": self.seed,
+            "posts": {
+                post_id: {
+                    "created_utc": created_utc,
+                    "signature": self.signatures.get(post_id),
+                    "links": self.links[post_id],
+                    "words": self.word_counts[post_id],
+                }
+                for post_id, created_utc in self.created.items()
+            },
+        }
+        path.write_text(json.dumps(data, separators=(",", ":")), encoding="utf-8")
+
+    @classmethod
+    def load(
+        cls,
+        path: Path,
+        num_perm: int = 128,
+        bands: int = 16,
+        threshold: float = 0.8,
+        seed: int = 1,
+    ) -> NearDuplicateIndex:
+        """Load a saved index, or return an empty one if *path* is missing or unusable.
+
+        Signatures computed with different parameters are not comparable, so a
+        file written with another num_perm/bands/seed is discarded.
+        """
+        index = cls(num_perm=num_perm, bands=bands, threshold=threshold, seed=seed)
+        path = Path(path)
+        if not path.exists():
+            return index
+
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+            if (data["num_perm"], data["bands"], data["seed"]) != (num_perm, bands, seed):
+                logger.warning("Signature store %s uses different MinHash parameters, rebuilding", path)
+                return index
+            for post_id, entry in data["posts"].items():
+                index._insert(
+                    post_id, entry["created_utc"], entry["signature"], entry["links"], entry["words"]
+                )
+        except (OSError, ValueError, KeyError, TypeError) as exc:
+            logger.warning("Ignoring unreadable signature store %s: %s", path, exc)
+            return cls(num_perm=num_perm, bands=bands, threshold=threshold, seed=seed)
+
+        return index
+
+
+def find_duplicates(posts: list[Post], index: NearDuplicateIndex) -> dict[str, str]:
+    """Index *posts* and map each near-duplicate post id to its original's id.
+
+    Posts are indexed in (created_utc, id) order, so each repost points at an
+    earlier post. That original may itself be a repost, or a post from a
+    previous build that is only present in the index.
+    """
+    duplicates: dict[str, str] = {}
+    for post in sorted(posts, key=lambda p: (p.created_utc, p.id)):
+        original = index.add(post)
+        if original is not None:
+            duplicates[post.id] = original
+    return duplicates
+
+
+def collapse_duplicates(posts: list[Post], index: NearDuplicateIndex) -> list[Post]:
+    """Keep one post per story, preserving order.
+
+    Posts linked by duplicate relations form a story. Of each story only the
+    earliest post present in *posts* is kept, even when the story's true
+    original is a post from a previous build that is no longer fetched.
+    """
+    duplicates = find_duplicates(posts, index)
+
+    # Union-find over duplicate relations; ids absent from *posts* join too
+    parent: dict[str, str] = {}
+
+    def root(post_id: str) -> str:
+        while parent.get(post_id, post_id) != post_id:
+            post_id = parent[post_id]
+        return post_id
+
+    for dup, original in duplicates.items():
+        parent[root(dup)] = root(original)
+
+    kept: dict[str, Post] = {}
+    for post in sorted(posts, key=lambda p: (p.created_utc, p.id)):
+        story = root(post.id)
+        if story in kept:
+            logger.info("Collapsing near-duplicate post %s into %s", post.id, kept[story].id)
+        else:
+            kept[story] = post
+    kept_ids = {post.id for post in kept.values()}
+    return [post for post in posts if post.id in kept_ids]
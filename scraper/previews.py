@@ -0,0 +1,262 @@
+"""
+Fetch titles and descriptions of external links for link previews.
+
+Links are fetched concurrently by a bounded pool of async workers, with a
+per-host concurrency limit so a post full of links to one site does not
+hammer it. Results (including failures) are kept in an on-disk cache with a
+TTL, so each URL is fetched at most once per TTL across builds and the build
+time does not grow with the total number of links in the archive.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import html
+import json
+import logging
+import re
+import time
+from collections import deque
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import httpx
+
+from scraper.fetch import USER_AGENT
+
+logger = logging.getLogger(__name__)
+
+# Successful previews are refreshed weekly, failures retried after a day
+PREVIEW_TTL = 7 * 24 * 3600
+NEGATIVE_TTL = 24 * 3600
+
+# Only the document head is needed; stop reading after this many bytes
+_MAX_BYTES = 64 * 1024
+_MAX_DESCRIPTION = 300
+
+_TITLE_RE = re.compile(r"<title[^>]*>(.*?)</title>", re.IGNORECASE | re.DOTALL)
+_META_RE = re.compile(r"<meta\s[^>]*>", re.IGNORECASE)
+_ATTR_RE = re.compile(r'([\w:-]+)\s*=\s*(?:"([^"]*)"|\'([^\']*)\')')
+
+
+@dataclass
+class LinkPreview:
+    """Metadata of one external link. ok=False marks a cached failure."""
+
+    url: str
+    title: str
+    description: str
+    fetched_at: float  # Unix timestamp
+    ok: bool
+
+
+def _clean(text: str) -> str:
+    """Unescape HTML entities and collapse whitespace."""
+    return " ".join(html.unescape(text).split())
+
+
+def _parse_metadata(document: str) -> tuple[str, str]:
+    """Extract (title, description) from an HTML document head.
+
+    Prefers OpenGraph og:title/og:description, falls back to <title> and
+    <meta name="description">.
+    """
+    meta: dict[str, str] = {}
+    for tag in _META_RE.findall(document):
+        attrs = {m.group(1).lower(): m.group(2) if m.group(2) is not None else m.group(3)
+                 for m in _ATTR_RE.finditer(tag)}
+        key = (attrs.get("property") or attrs.get("name") or "").lower()
+        if key and "content" in attrs:
+            meta.setdefault(key, attrs["content"])
+
+    title = meta.get("og:title", "")
+    if not title:
+        match = _TITLE_RE.search(document)
+        title = match.group(1) if match else ""
+
+    description = meta.get("og:description") or meta.get("description", "")
+    description = _clean(description)
+    if len(description) > _MAX_DESCRIPTION:
+        description = description[:_MAX_DESCRIPTION].rstrip() + "…"
+
+    return _clean(title), description
+
+
+class PreviewCache:
+    """JSON-backed cache of LinkPreviews keyed by URL."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self.entries: dict[str, LinkPreview] = {}
+        if self.path.exists():
+            try:
+                data = json.loads(self.path.read_text(encoding="utf-8"))
+                self.entries = {url: LinkPreview(**entry) for url, entry in data.items()}
+            except (OSError, ValueError, TypeError) as exc:
+                logger.warning("Ignoring unreadable preview cache %s: %s", self.path, exc)
+
+    def get(self, url: str, now: float | None = None) -> LinkPreview | None:
+        """Return the cached preview for *url* unless it has expired."""
+        entry = self.entries.get(url)
+        if entry is None:
+            return None
+        ttl = PREVIEW_TTL if entry.ok else NEGATIVE_TTL
+        if (now if now is not None else time.time()) - entry.fetched_at > ttl:
+            return None
+        return entry
+
+    def put(self, preview: LinkPreview) -> None:
+        """Store or replace the preview for preview.url."""
+        self.entries[preview.url] = preview
+
+    def save(self) -> None:
+        """Write unexpired entries back to the cache file, dropping the rest.
+
+        Expired entries would be refetched anyway, so pruning them keeps the
+        file proportional to recently seen links rather than all links ever.
+        """
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        now = time.time()
+        data = {
+            url: asdict(entry)
+            for url, entry in self.entries.items()
+            if self.get(url, now) is not None
+        }
+        self.path.write_text(json.dumps(data, ensure_ascii=False, indent=1), encoding="utf-8")
+
+
+async def _fetch_one(client: httpx.AsyncClient, url: str, timeout: float) -> LinkPreview:
+    """Fetch a single URL and parse its preview metadata.
+
+    Never raises: malformed URLs, HTTP errors and fetches exceeding *timeout*
+    seconds in total are returned as failures (ok=False) for negative caching.
+    """
+    now = time.time()
+    try:
+        return await asyncio.wait_for(_download(client, url, now), timeout)
+    except (httpx.HTTPError, httpx.InvalidURL, ValueError) as exc:
+        logger.warning("Could not fetch link preview for %s: %s", url, exc)
+    except TimeoutError:
+        logger.warning("Could not fetch link preview for %s: timed out after %ss", url, timeout)
+    return LinkPreview(url, "", "", now, False)
+
+
+async def _download(client: httpx.AsyncClient, url: str, now: float) -> LinkPreview:
+    """Read the head of *url* and parse it; errors propagate to _fetch_one."""
+    async with client.stream("GET", url) as response:
+        response.raise_for_status()
+        if "html" not in response.headers.get("content-type", ""):
+            # Not a page (PDF, image, ...): nothing to preview, but don't refetch
+            return LinkPreview(url, "", "", now, True)
+
+        chunks: list[bytes] = []
+        size = 0
+        async for chunk in response.aiter_bytes():
+            chunks.append(chunk)
+            size += len(chunk)
+            if size >= _MAX_BYTES:
+                break
+        encoding = response.encoding or "utf-8"
+
+    try:
+        document = b"".join(chunks)[:_MAX_BYTES].decode(encoding, errors="replace")
+    except LookupError:
+        # Server declared an encoding Python doesn't know
+        document = b"".join(chunks)[:_MAX_BYTES].decode("utf-8", errors="replace")
+    title, description = _parse_metadata(document)
+    return LinkPreview(url, title, description, now, True)
+
+
+async def _fetch_all(
+    urls: list[str],
+    transport: httpx.AsyncBaseTransport | None,
+    workers: int,
+    per_host: int,
+    timeout: float,
+) -> list[LinkPreview]:
+    # One queue per host: a worker only takes a URL whose host has a free
+    # slot, so it never sits on a pool slot waiting for a busy host.
+    pending: dict[str, deque[str]] = {}
+    for url in urls:
+        try:
+            host = urlsplit(url).hostname or ""
+        except ValueError:
+            # Malformed (e.g. "https://[bad/"); _fetch_one records the failure
+            host = ""
+        pending.setdefault(host, deque()).append(url)
+
+    active: dict[str, int] = dict.fromkeys(pending, 0)
+    ready = asyncio.Condition()
+    results: list[LinkPreview] = []
+
+    def next_host() -> str | None:
+        return next((h for h, q in pending.items() if q and active[h] < per_host), None)
+
+    async def worker(client: httpx.AsyncClient) -> None:
+        while True:
+            async with ready:
+                while (host := next_host()) is None:
+                    if not any(pending.values()):
+                        return
+                    # Every remaining host is at its limit; wait for a slot
+                    await ready.wait()
+                url = pending[host].popleft()
+                active[host] += 1
+            try:
+                results.append(await _fetch_one(client, url, timeout))
+            finally:
+                async with ready:
+                    active[host] -= 1
+                    ready.notify_all()
+
+    async with httpx.AsyncClient(
+        transport=transport,
+        headers={"User-Agent": USER_AGENT},
+        timeout=timeout,
+        follow_redirects=True,
+    ) as client:
+        await asyncio.gather(*(worker(client) for _ in range(min(workers, len(urls)))))
+
+    return results
+
+
+def fetch_previews(
+    urls: list[str],
+    cache: PreviewCache,
+    transport: httpx.AsyncBaseTransport | None = None,
+    workers: int = 8,
+    per_host: int = 2,
+    timeout: float = 5.0,
+) -> dict[str, LinkPreview]:
+    """Return previews for *urls*, fetching only those missing from *cache*.
+
+    Args:
+        urls: External URLs, e.g. collected from Post.external_links. Duplicates are fine.
+        cache: Cache consulted first and updated with every fetch result.
+        transport: Optional httpx transport, e.g. httpx.MockTransport in tests.
+        workers: Maximum number of requests in flight overall.
+        per_host: Maximum number of requests in flight per host.
+        timeout: Total time limit per URL in seconds, covering connect and
+                 all reads. Also passed to httpx as its per-phase timeout.
+
+    Returns:
+        Dict mapping each URL to its preview. Failed fetches are included with
+        ok=False so callers can fall back to a bare link.
+    """
+    previews: dict[str, LinkPreview] = {}
+    missing: list[str] = []
+    for url in dict.fromkeys(urls):
+        cached = cache.get(url)
+        if cached is not None:
+            previews[url] = cached
+        else:
+            missing.append(url)
+
+    if missing:
+        for preview in asyncio.run(_fetch_all(missing, transport, workers, per_host, timeout)):
+            cache.put(preview)
+            previews[preview.url] = preview
+
+    logger.info("Link previews: %d cached, %d fetched", len(previews) - len(missing), len(missing))
+    return previews
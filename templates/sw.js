@@ -0,0 +1,100 @@
+{# Service worker, rendered by generator/offline.generate_service_worker. -#}
+// Generated from templates/sw.js by generator/offline.py — do not edit.
+const VERSION = {{ version | tojson }};
+const MANIFEST = {{ manifest | tojson }};
+const FONT_HOSTS = ["fonts.googleapis.com", "fonts.gstatic.com"];
+
+// Only the precache is versioned. HTML outside the manifest and Google Fonts
+// live in stable caches that survive deploys, so unchanged files (fonts in
+// particular) are not downloaded again after every build.
+const PRECACHE = "fefe-precache-" + VERSION;
+const RUNTIME = "fefe-runtime";
+const FONTS = "fefe-fonts";
+
+// Cache keys carry the content hash, so an unchanged file keeps its key
+// across deploys and can be copied from the previous precache instead of
+// being downloaded again.
+const scope = new URL(self.registration.scope);
+const keyFor = new Map(
+  MANIFEST.map(({ url, revision }) => {
+    const absolute = new URL(url, scope);
+    const key = new URL(absolute);
+    key.searchParams.set("__rev", revision);
+    return [absolute.href, key.href];
+  })
+);
+
+function normalize(url) {
+  const u = new URL(url);
+  u.search = "";
+  u.hash = "";
+  if (u.pathname.endsWith("/")) u.pathname += "index.html";
+  return u.href;
+}
+
+self.addEventListener("install", (event) => {
+  event.waitUntil((async () => {
+    const cache = await caches.open(PRECACHE);
+    await Promise.all([...keyFor.values()].map(async (key) => {
+      const previous = await caches.match(key);
+      if (previous) return cache.put(key, previous);
+      const response = await fetch(key, { cache: "no-cache" });
+      if (!response.ok) throw new Error("precache failed: " + key);
+      return cache.put(key, response);
+    }));
+    await self.skipWaiting();
+  })());
+});
+
+self.addEventListener("activate", (event) => {
+  event.waitUntil((async () => {
+    const names = await caches.keys();
+    await Promise.all(
+      names
+        // Older precaches, plus per-version runtime caches of earlier workers
+        .filter((name) => /^fefe-(precache|runtime)-/.test(name) && name !== PRECACHE)
+        .map((name) => caches.delete(name))
+    );
+    await self.clients.claim();
+  })());
+});
+
+// Only successful CORS/same-origin responses are stored: opaque responses
+// are padded to several MB each in the storage quota.
+async function staleWhileRevalidate(event, request, cacheName) {
+  const cache = await caches.open(cacheName);
+  const fresh = fetch(request).then((response) => {
+    if (response.ok) {
+      return cache.put(request, response.clone()).then(() => response);
+    }
+    return response;
+  });
+  event.waitUntil(fresh.catch(() => {}));
+  return (await cache.match(request)) || fresh;
+}
+
+self.addEventListener("fetch", (event) => {
+  const request = event.request;
+  if (request.method !== "GET") return;
+  const url = new URL(request.url);
+
+  if (FONT_HOSTS.includes(url.hostname)) {
+    event.respondWith(staleWhileRevalidate(event, request, FONTS));
+    return;
+  }
+  if (url.origin !== scope.origin) return;
+
+  const key = keyFor.get(normalize(request.url));
+  const isHtml = request.mode === "navigate" ||
+    (request.headers.get("accept") || "").includes("text/html");
+
+  if (isHtml && !key) {
+    // Render from cache immediately, refresh in the background
+    event.respondWith(staleWhileRevalidate(event, request, RUNTIME));
+  } else if (key) {
+    // Precached files, HTML included, are current for this deploy. They are
+    // revalidated by the worker update check on navigation: a deploy that
+    // changes them ships a new sw.js that precaches only the changed files.
+    event.respondWith(caches.match(key).then((cached) => cached || fetch(request)));
+  }
+});